@@ -33,30 +33,29 @@ from tgb.utils.utils import save_results
 # ==================
 # ==================
 
-def test(data, test_mask, neg_sampler, split_mode):
+def test(data, neg_sampler, split_mode):
     r"""
     Evaluated the dynamic link prediction
     Evaluation happens as 'one vs. many', meaning that each positive edge is evaluated against many negative edges
 
     Parameters:
-        data: a dataset object
-        test_mask: required masks to load the test set edges
+        data: the edges of the evaluation split (`dataset.val_data` or `dataset.test_data`)
         neg_sampler: an object that gives the negative edges corresponding to each positive edge
         split_mode: specifies whether it is the 'validation' or 'test' set to correctly load the negatives
     Returns:
         perf_metric: the result of the performance evaluation
     """
-    num_batches = math.ceil(len(data['sources'][test_mask]) / BATCH_SIZE)
+    num_batches = math.ceil(len(data['sources']) / BATCH_SIZE)
     perf_list = []
     hits_list = []
     for batch_idx in tqdm(range(num_batches)):
         start_idx = batch_idx * BATCH_SIZE
-        end_idx = min(start_idx + BATCH_SIZE, len(data['sources'][test_mask]))
+        end_idx = min(start_idx + BATCH_SIZE, len(data['sources']))
         pos_src, pos_dst, pos_t, pos_edge = (
-            data['sources'][test_mask][start_idx: end_idx],
-            data['destinations'][test_mask][start_idx: end_idx],
-            data['timestamps'][test_mask][start_idx: end_idx],
-            data['edge_type'][test_mask][start_idx: end_idx],
+            data['sources'][start_idx: end_idx],
+            data['destinations'][start_idx: end_idx],
+            data['timestamps'][start_idx: end_idx],
+            data['edge_type'][start_idx: end_idx],
         )
         neg_batch_list = neg_sampler.query_batch(pos_src, pos_dst, pos_t, pos_edge, split_mode=split_mode)
         
@@ -125,15 +124,15 @@ data = dataset.full_data
 metric = dataset.eval_metric
 
 
-# get masks
-train_mask = dataset.train_mask
-val_mask = dataset.val_mask
-test_mask = dataset.test_mask
+# get splits
+train_data = dataset.train_data
+val_data = dataset.val_data
+test_data = dataset.test_data
 
 #data for memory in edgebank
-hist_src = np.concatenate([data['sources'][train_mask]])
-hist_dst = np.concatenate([data['destinations'][train_mask]])
-hist_ts = np.concatenate([data['timestamps'][train_mask]])
+hist_src = np.concatenate([train_data['sources']])
+hist_dst = np.concatenate([train_data['destinations']])
+hist_ts = np.concatenate([train_data['timestamps']])
 
 # Set EdgeBank with memory updater
 edgebank = EdgeBankPredictor(
@@ -164,7 +163,7 @@ dataset.load_val_ns()
 
 # testing ...
 start_val = timeit.default_timer()
-perf_metric_val, perf_hits_val = test(data, val_mask, neg_sampler, split_mode='val')
+perf_metric_val, perf_hits_val = test(val_data, neg_sampler, split_mode='val')
 end_val = timeit.default_timer()
 
 print(f"INFO: val: Evaluation Setting: >>> ONE-VS--ALL <<< ")
@@ -181,7 +180,7 @@ dataset.load_test_ns()
 
 # testing ...
 start_test = timeit.default_timer()
-perf_metric_test, perf_hits_test = test(data, test_mask, neg_sampler, split_mode='test')
+perf_metric_test, perf_hits_test = test(test_data, neg_sampler, split_mode='test')
 end_test = timeit.default_timer()
 
 print(f"INFO: Test: Evaluation Setting: >>>  <<< ")
@@ -23,7 +23,7 @@ from torch_geometric.loader import TemporalDataLoader
 from torch_geometric.nn import TransformerConv
 
 # internal imports
-from tgb.utils.utils import get_args, set_random_seed, save_results
+from tgb.utils.utils import get_args, set_random_seed, save_results, seq_batches, temporal_data_to_np
 from tgb.linkproppred.evaluate import Evaluator
 from modules.decoder import LinkPredictor
 from modules.emb_module import GraphAttentionEmbedding
@@ -107,13 +107,14 @@ def train():
 
 
 @torch.no_grad()
-def test(loader, neg_sampler, split_mode):
+def test(loader, split_np, neg_sampler, split_mode):
     r"""
     Evaluated the dynamic link prediction
     Evaluation happens as 'one vs. many', meaning that each positive edge is evaluated against many negative edges
 
     Parameters:
         loader: an object containing positive attributes of the positive edges of the evaluation set
+        split_np: numpy arrays (BatchNP) of the evaluation set, in the same order as the batches of `loader`
         neg_sampler: an object that gives the negative edges corresponding to each positive edge
         split_mode: specifies whether it is the 'validation' or 'test' set to correctly load the negatives
     Returns:
@@ -125,16 +126,20 @@ def test(loader, neg_sampler, split_mode):
 
     perf_list = []
 
+    start = 0
     for pos_batch in loader:
-        pos_src, pos_dst, pos_t, pos_msg, pos_rel = (
+        pos_src, pos_dst, pos_t, pos_msg = (
             pos_batch.src,
             pos_batch.dst,
             pos_batch.t,
             pos_batch.msg,
-            pos_batch.edge_type
         )
 
-        neg_batch_list = neg_sampler.query_batch(pos_src, pos_dst, pos_t, pos_rel, split_mode=split_mode)
+        #* query with slices of the precomputed numpy arrays, no device to host copy per batch
+        end = start + pos_batch.num_events
+        pos_dst_np = split_np.dst[start:end]
+        neg_batch_list = neg_sampler.query_batch(split_np.src[start:end], pos_dst_np, split_np.t[start:end], split_np.rel[start:end], split_mode=split_mode)
+        start = end
 
         # pos_msg_new = torch.cat([pos_msg,pos_rel.unsqueeze(dim=1)], dim=1)   
 
@@ -143,7 +148,7 @@ def test(loader, neg_sampler, split_mode):
             src = torch.full((1 + len(neg_batch),), pos_src[idx], device=device)
             dst = torch.tensor(
                 np.concatenate(
-                    ([np.array([pos_dst.cpu().numpy()[idx]]), np.array(neg_batch)]),
+                    ([np.array([pos_dst_np[idx]]), np.array(neg_batch)]),
                     axis=0,
                 ),
                 device=device,
@@ -265,11 +270,11 @@ print ("shape of node type is", node_type.shape)
 train_data = data[train_mask]
 val_data = data[val_mask]
 test_data = data[test_mask]
+val_np = temporal_data_to_np(val_data)
+test_np = temporal_data_to_np(test_data)
 print ("finished loading PyG data")
 
 train_loader = TemporalDataLoader(train_data, batch_size=BATCH_SIZE)
-val_loader = TemporalDataLoader(val_data, batch_size=BATCH_SIZE)
-test_loader = TemporalDataLoader(test_data, batch_size=BATCH_SIZE)
 
 start_time = timeit.default_timer()
 
@@ -358,7 +363,7 @@ for run_idx in range(NUM_RUNS):
 
         # validation
         start_val = timeit.default_timer()
-        perf_metric_val = test(val_loader, neg_sampler, split_mode="val")
+        perf_metric_val = test(seq_batches(val_data, BATCH_SIZE), val_np, neg_sampler, split_mode="val")
         print(f"\tValidation {metric}: {perf_metric_val: .4f}")
         print(f"\tValidation: Elapsed time (s): {timeit.default_timer() - start_val: .4f}")
         val_perf_list.append(perf_metric_val)
@@ -379,7 +384,7 @@ for run_idx in range(NUM_RUNS):
 
     # final testing
     start_test = timeit.default_timer()
-    perf_metric_test = test(test_loader, neg_sampler, split_mode="test")
+    perf_metric_test = test(seq_batches(test_data, BATCH_SIZE), test_np, neg_sampler, split_mode="test")
 
     print(f"INFO: Test: Evaluation Setting: >>> ONE-VS-MANY <<< ")
     print(f"\tTest: {metric}: {perf_metric_test: .4f}")
@@ -0,0 +1,114 @@
+import sys
+sys.path.insert(0,'/../../../')
+import argparse
+import os.path as osp
+import numpy as np
+import timeit
+import torch
+from tqdm import tqdm
+from tgb.linkproppred.dataset_pyg import PyGLinkPropPredDataset
+from torch_geometric.loader import TemporalDataLoader
+from tgb.linkproppred.evaluate import Evaluator
+from tgb.utils.utils import parallel_query_batch, temporal_data_to_np
+
+DATA = "thgl-myket"
+
+parser = argparse.ArgumentParser('*** TGB ns example ***')
+parser.add_argument('--refresh-ns', action='store_true', help='re-query the negative samples instead of using the cached ones')
+args = parser.parse_args()
+
+# data loading
+dataset = PyGLinkPropPredDataset(name=DATA, root="datasets")
+train_mask = dataset.train_mask
+val_mask = dataset.val_mask
+test_mask = dataset.test_mask
+data = dataset.get_TemporalData()
+metric = dataset.eval_metric
+
+print ("there are {} nodes and {} edges".format(dataset.num_nodes, dataset.num_edges))
+print ("there are {} relation types".format(dataset.num_rels))
+
+
+timestamp = data.t
+head = data.src
+tail = data.dst
+edge_type = data.edge_type #relation
+neg_sampler = dataset.negative_sampler
+
+train_data = data[train_mask]
+val_data = data[val_mask]
+test_data = data[test_mask]
+
+
+metric = dataset.eval_metric
+evaluator = Evaluator(name=DATA)
+neg_sampler = dataset.negative_sampler
+
+BATCH_SIZE = 200
+#* negatives are queried in larger chunks to amortize the per call overhead of query_batch, then split into model sized batches
+NS_BATCH = 4096
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def query_split_ns(split_np, split_mode, load_ns):
+    r"""
+    negatives of every edge of a split, flattened into one array with offsets (edge i has negs[ptr[i]:ptr[i+1]])
+    query_batch is deterministic, so the result is saved after the first run and memory-mapped afterwards,
+    which also skips loading the negative sample pickle
+    """
+    #* the cache is named after the versioned negative sample pickle, so a version bump does not reuse stale negatives
+    ns_name = osp.splitext(osp.basename(dataset.dataset.meta_dict[f"{split_mode}_ns"]))[0]
+    fname = osp.join(dataset.dataset.root, f"{ns_name}.npy")
+    ptr_fname = osp.join(dataset.dataset.root, f"{ns_name}_ptr.npy")
+    if osp.exists(fname) and osp.exists(ptr_fname) and not args.refresh_ns:
+        return np.load(fname, mmap_mode='r'), np.load(ptr_fname)
+
+    load_ns()
+    #* the batches are independent, query them on up to 8 cpu cores; results are returned in batch order
+    neg_batch_lists = parallel_query_batch(neg_sampler, *split_np, split_mode=split_mode, batch_size=NS_BATCH)
+    neg_lists = [np.asarray(neg) for neg_batch_list in neg_batch_lists for neg in neg_batch_list]
+    ptr = np.zeros(len(neg_lists) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(neg) for neg in neg_lists])
+    negs = np.concatenate(neg_lists) if len(neg_lists) > 0 else np.zeros(0, dtype=np.int64)
+    np.save(fname, negs)
+    np.save(ptr_fname, ptr)
+    return negs, ptr
+
+
+start_time = timeit.default_timer()
+if device.type == "cuda":
+    #load the ns samples first
+    dataset.load_val_ns()
+    #* the lookup runs on the gpu and the negatives stay there for the model, no .cpu().numpy() per batch
+    #* batches are sliced by worker processes into pinned memory so the copy to the gpu is asynchronous
+    val_loader = TemporalDataLoader(val_data, batch_size=NS_BATCH, num_workers=4, pin_memory=True)
+    for batch in tqdm(val_loader):
+        batch = batch.to(device, non_blocking=True)
+        neg_chunk = neg_sampler.query_batch_torch(batch.src, batch.dst, batch.t, batch.edge_type, split_mode='val')
+        #* model sized batches of negatives, views of neg_chunk
+        neg_batch_list = neg_chunk.split(BATCH_SIZE)
+else:
+    #* the splits are read-only cpu tensors, convert them to numpy once (zero-copy) and slice per batch
+    val_np = temporal_data_to_np(val_data)
+    val_negs, val_ptr = query_split_ns(val_np, 'val', dataset.load_val_ns)
+    for start in tqdm(range(0, len(val_np.src), BATCH_SIZE)):
+        end = min(start + BATCH_SIZE, len(val_np.src))
+        neg_batch_list = [val_negs[val_ptr[i]:val_ptr[i + 1]] for i in range(start, end)]
+print ("loading ns samples from validation", timeit.default_timer() - start_time)
+
+start_time = timeit.default_timer()
+if device.type == "cuda":
+    dataset.load_test_ns()
+    test_loader = TemporalDataLoader(test_data, batch_size=NS_BATCH, num_workers=4, pin_memory=True)
+    for batch in tqdm(test_loader):
+        batch = batch.to(device, non_blocking=True)
+        neg_chunk = neg_sampler.query_batch_torch(batch.src, batch.dst, batch.t, batch.edge_type, split_mode='test')
+        neg_batch_list = neg_chunk.split(BATCH_SIZE)
+else:
+    test_np = temporal_data_to_np(test_data)
+    test_negs, test_ptr = query_split_ns(test_np, 'test', dataset.load_test_ns)
+    for start in tqdm(range(0, len(test_np.src), BATCH_SIZE)):
+        end = min(start + BATCH_SIZE, len(test_np.src))
+        neg_batch_list = [test_negs[test_ptr[i]:test_ptr[i + 1]] for i in range(start, end)]
+print ("loading ns samples from test", timeit.default_timer() - start_time)
+print ("retrieved all negative samples")
@@ -10,7 +10,6 @@ modules_path = osp.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '
 sys.path.append(modules_path)
 
 from tgb.linkproppred.dataset_pyg import PyGLinkPropPredDataset
-from torch_geometric.loader import TemporalDataLoader
 from tgb.linkproppred.evaluate import Evaluator
 
 DATA = "tkgl-icews"
@@ -43,15 +42,17 @@ evaluator = Evaluator(name=DATA)
 neg_sampler = dataset.negative_sampler
 
 BATCH_SIZE = 200
-val_loader = TemporalDataLoader(val_data, batch_size=BATCH_SIZE)
-test_loader = TemporalDataLoader(test_data, batch_size=BATCH_SIZE)
+
+#* the splits are cpu tensors, .numpy() shares their memory so each batch is a plain slice
+val_src, val_dst, val_t, val_rel = val_data.src.numpy(), val_data.dst.numpy(), val_data.t.numpy(), val_data.edge_type.numpy()
+test_src, test_dst, test_t, test_rel = test_data.src.numpy(), test_data.dst.numpy(), test_data.t.numpy(), test_data.edge_type.numpy()
 
 start_time = timeit.default_timer()
 #load the ns samples first
 dataset.load_val_ns()
-for batch in tqdm(val_loader):
-    src, pos_dst, t, msg, rel = batch.src, batch.dst, batch.t, batch.msg, batch.edge_type
-    neg_batch_list = neg_sampler.query_batch(src.detach().cpu().numpy(), pos_dst.detach().cpu().numpy(), t.detach().cpu().numpy(), rel.detach().cpu().numpy(), split_mode='val')
+for start in tqdm(range(0, len(val_src), BATCH_SIZE)):
+    end = start + BATCH_SIZE
+    neg_batch_list = neg_sampler.query_batch(val_src[start:end], val_dst[start:end], val_t[start:end], val_rel[start:end], split_mode='val')
 print ("loading ns samples from validation", timeit.default_timer() - start_time)
 # for i, (src, dst, t, rel) in enumerate(zip(val_data.src, val_data.dst, val_data.t, val_data.edge_type)):
 #     #must use np array to query
@@ -59,9 +60,9 @@ print ("loading ns samples from validation", timeit.default_timer() - start_time
 
 start_time = timeit.default_timer()
 dataset.load_test_ns()
-for batch in test_loader:
-    src, pos_dst, t, msg, rel = batch.src, batch.dst, batch.t, batch.msg, batch.edge_type
-    neg_batch_list = neg_sampler.query_batch(src.detach().cpu().numpy(), pos_dst.detach().cpu().numpy(), t.detach().cpu().numpy(), rel.detach().cpu().numpy(), split_mode='test')
+for start in range(0, len(test_src), BATCH_SIZE):
+    end = start + BATCH_SIZE
+    neg_batch_list = neg_sampler.query_batch(test_src[start:end], test_dst[start:end], test_t[start:end], test_rel[start:end], split_mode='test')
 print ("loading ns samples from test", timeit.default_timer() - start_time)
 # for i, (src, dst, t, rel) in enumerate(zip(test_data.src, test_data.dst, test_data.t, test_data.edge_type)):
 #     #must use np array to query
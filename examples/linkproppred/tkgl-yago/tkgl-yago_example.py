@@ -1,4 +1,3 @@
-import numpy as np
 from tgb.linkproppred.dataset_pyg import PyGLinkPropPredDataset
 from tgb.linkproppred.evaluate import Evaluator
 
@@ -34,9 +33,11 @@ neg_sampler = dataset.negative_sampler
 
 #load the ns samples first
 dataset.load_val_ns()
-for i, (src, dst, t, rel) in enumerate(zip(val_data.src, val_data.dst, val_data.t, val_data.edge_type)):
+#* the splits are cpu tensors, .numpy() shares their memory so each edge is a plain slice
+val_src, val_dst, val_t, val_rel = val_data.src.numpy(), val_data.dst.numpy(), val_data.t.numpy(), val_data.edge_type.numpy()
+for i in range(len(val_src)):
     #must use np array to query
-    neg_batch_list = neg_sampler.query_batch(np.array([src]), np.array([dst]), np.array([t]), edge_type=np.array([rel]), split_mode='val')
+    neg_batch_list = neg_sampler.query_batch(val_src[i:i+1], val_dst[i:i+1], val_t[i:i+1], edge_type=val_rel[i:i+1], split_mode='val')
 
 print ("retrieved all negative samples")
 
@@ -9,6 +9,11 @@ import zipfile
 import requests
 from clint.textui import progress
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 
 from tgb.linkproppred.negative_sampler import NegativeEdgeSampler
 from tgb.linkproppred.tkg_negative_sampler import TKGNegativeEdgeSampler
@@ -45,6 +50,7 @@ class LinkPropPredDataset(object):
         root: Optional[str] = "datasets",
         meta_dict: Optional[dict] = None,
         preprocess: Optional[bool] = True,
+        mmap: Optional[bool] = True,
     ):
         r"""Dataset class for link prediction dataset. Stores meta information about each dataset such as evaluation metrics etc.
         also automatically pre-processes the dataset.
@@ -53,8 +59,10 @@ class LinkPropPredDataset(object):
             root: root directory to store the dataset folder
             meta_dict: dictionary containing meta information about the dataset, should contain key 'dir_name' which is the name of the dataset folder
             preprocess: whether to pre-process the dataset
+            mmap: whether to memory-map the processed feature files instead of reading them into memory
         """
         self.name = name  ## original name
+        self.mmap = mmap
         # check if dataset url exist
         if self.name in DATA_URL_DICT:
             self.url = DATA_URL_DICT[self.name]
@@ -108,6 +116,7 @@ class LinkPropPredDataset(object):
         self._node_feat = None
         self._edge_feat = None
         self._full_data = None
+        self._edge_records = None
         self._train_data = None
         self._val_data = None
         self._test_data = None
@@ -243,11 +252,29 @@ class LinkPropPredDataset(object):
                 BColors.FAIL + "Data not found error, download " + self.name + " failed"
             )
 
-    def generate_processed_files(self) -> pd.DataFrame:
+    def _load_feat(self, fname: str, mmap_mode: Optional[str]) -> np.ndarray:
+        r"""
+        load a processed feature file, a legacy .pkl file from before the features were stored as .npy is converted once
+        Args:
+            fname: path of the .npy feature file
+            mmap_mode: passed to np.load
+        Returns:
+            feat: np.ndarray
+        """
+        legacy_fname = osp.splitext(fname)[0] + ".pkl"
+        if (not osp.exists(fname)) and (osp.exists(legacy_fname)):
+            print("converting legacy feature file " + legacy_fname)
+            np.save(fname, np.asarray(load_pkl(legacy_fname), dtype=np.float32))
+            os.remove(legacy_fname)
+        return np.load(fname, mmap_mode=mmap_mode)
+
+    def generate_processed_files(self, load_df: bool = True) -> pd.DataFrame:
         r"""
         turns raw data .csv file into a pandas data frame, stored on disc if not already
+        Args:
+            load_df: whether to load the processed data frame from disc, the features are always loaded
         Returns:
-            df: pandas data frame
+            df: pandas data frame, None if it is already processed and load_df is False
         """
         node_feat = None
         if not osp.exists(self.meta_dict["fname"]):
@@ -267,22 +294,35 @@ class LinkPropPredDataset(object):
 
 
         OUT_DF = self.root + "/" + "ml_{}.pkl".format(self.name)
-        OUT_EDGE_FEAT = self.root + "/" + "ml_{}.pkl".format(self.name + "_edge")
+        OUT_DF_PARQUET = self.root + "/" + "ml_{}.parquet".format(self.name)
+        OUT_EDGE_FEAT = self.root + "/" + "ml_{}.npy".format(self.name + "_edge")
         OUT_NODE_ID = self.root + "/" + "ml_{}.pkl".format(self.name + "_nodeid")
         if self.meta_dict["nodefile"] is not None:
-            OUT_NODE_FEAT = self.root + "/" + "ml_{}.pkl".format(self.name + "_node")
+            OUT_NODE_FEAT = self.root + "/" + "ml_{}.npy".format(self.name + "_node")
         if self.meta_dict["nodeTypeFile"] is not None:
             OUT_NODE_TYPE = self.root + "/" + "ml_{}.pkl".format(self.name + "_nodeType")
 
-        if (osp.exists(OUT_DF)) and (self.version_passed is True):
+        #* features are stored as .npy so they can be memory-mapped, pages are only read from disc when touched
+        #* copy-on-write keeps the arrays writable without modifying the files on disc
+        mmap_mode = "c" if self.mmap else None
+
+        #* directories processed before the features were stored as .npy still hold them as .pkl
+        has_edge_feat = osp.exists(OUT_EDGE_FEAT) or osp.exists(osp.splitext(OUT_EDGE_FEAT)[0] + ".pkl")
+        if (osp.exists(OUT_DF)) and (has_edge_feat) and (self.version_passed is True):
             print("loading processed file")
-            df = pd.read_pickle(OUT_DF)
-            edge_feat = load_pkl(OUT_EDGE_FEAT)
+            if not load_df:
+                df = None
+            elif (pyarrow is not None) and (osp.exists(OUT_DF_PARQUET)):
+                #* columnar parquet file is preferred, the pickle is kept for backward compatibility
+                df = pd.read_parquet(OUT_DF_PARQUET)
+            else:
+                df = pd.read_pickle(OUT_DF)
+            edge_feat = self._load_feat(OUT_EDGE_FEAT, mmap_mode)
             if (self.name == "tkgl-wikidata") or (self.name == "tkgl-smallpedia"):
                 node_id = load_pkl(OUT_NODE_ID)
                 self._node_id = node_id
             if self.meta_dict["nodefile"] is not None:
-                node_feat = load_pkl(OUT_NODE_FEAT)
+                node_feat = self._load_feat(OUT_NODE_FEAT, mmap_mode)
             if self.meta_dict["nodeTypeFile"] is not None:
                 node_type = load_pkl(OUT_NODE_TYPE)
                 self._node_type = node_type
@@ -328,11 +368,19 @@ class LinkPropPredDataset(object):
             else:
                 raise ValueError(f"Dataset {self.name} not found.")
 
-            save_pkl(edge_feat, OUT_EDGE_FEAT)
+            #* all models consume float32 features, store them as float32 to halve memory and disc traffic
+            edge_feat = edge_feat.astype(np.float32, copy=False)
+            np.save(OUT_EDGE_FEAT, edge_feat)
+            #* reload the saved file so the first run returns the same (writable, memory-mapped) array as later runs,
+            #* instead of the read-only stride-0 placeholder view built by the parsers
+            edge_feat = np.load(OUT_EDGE_FEAT, mmap_mode=mmap_mode)
             df.to_pickle(OUT_DF)
+            if pyarrow is not None:
+                df.to_parquet(OUT_DF_PARQUET)
             if self.meta_dict["nodefile"] is not None:
-                node_feat = process_node_feat(self.meta_dict["nodefile"], node_ids)
-                save_pkl(node_feat, OUT_NODE_FEAT)
+                node_feat = process_node_feat(self.meta_dict["nodefile"], node_ids).astype(np.float32)
+                np.save(OUT_NODE_FEAT, node_feat)
+                node_feat = np.load(OUT_NODE_FEAT, mmap_mode=mmap_mode)
             if self.meta_dict["nodeTypeFile"] is not None:
                 node_type = process_node_type(self.meta_dict["nodeTypeFile"], node_ids)
                 save_pkl(node_type, OUT_NODE_TYPE)
@@ -348,42 +396,104 @@ class LinkPropPredDataset(object):
         generates the edge data and different train, val, test splits
         """
 
+        #* with pyarrow the columns are read from the parquet edgelist, which makes a separate cache redundant,
+        #* without it the edge arrays are cached on disc so the pickled data frame only needs to be loaded once
+        OUT_FULL = self.root + "/" + "ml_{}.npz".format(self.name + "_full")
+        OUT_DF_PARQUET = self.root + "/" + "ml_{}.parquet".format(self.name)
+        use_parquet = (pyarrow is not None) and (osp.exists(OUT_DF_PARQUET))
+        use_cache = (not use_parquet) and (osp.exists(OUT_FULL)) and (self.version_passed is True)
+
         # check if path to file is valid
-        df, edge_feat, node_feat = self.generate_processed_files()
-
-        #* design choice, only stores the original edges not the inverse relations on disc
-        if ("tkgl" in self.name):
-            df = add_inverse_quadruples(df)
-
-        sources = np.array(df["u"])
-        destinations = np.array(df["i"])
-        timestamps = np.array(df["ts"])
-        edge_idxs = np.array(df["idx"])
-        weights = np.array(df["w"])
-        edge_label = np.ones(len(df))  # should be 1 for all pos edges
+        df, edge_feat, node_feat = self.generate_processed_files(load_df=not use_cache)
+
+        #* node ids, edge ids and edge types fit into int32, halving the bytes moved by every index operation
+        #* timestamps stay int64 as unix timestamps can exceed the int32 range
+        id_range_msg = "node ids, edge ids and edge types must be smaller than 2^31 to be stored as int32"
+        if df is None:
+            print("loading cached edge arrays")
+            with np.load(OUT_FULL) as full_arrays:
+                sources = full_arrays["sources"]
+                destinations = full_arrays["destinations"]
+                timestamps = full_arrays["timestamps"]
+                edge_idxs = full_arrays["edge_idxs"]
+                weights = full_arrays["w"]
+                edge_type = full_arrays["edge_type"] if "edge_type" in full_arrays.files else None
+            #* caches written before the ids were stored as int32 are converted and rewritten once
+            save_cache = sources.dtype != np.int32
+            if save_cache:
+                id_arrays = [sources, destinations, edge_idxs] + ([edge_type] if edge_type is not None else [])
+                assert max(int(arr.max(initial=0)) for arr in id_arrays) < 2**31, id_range_msg
+                sources = sources.astype(np.int32)
+                destinations = destinations.astype(np.int32)
+                edge_idxs = edge_idxs.astype(np.int32)
+                if edge_type is not None:
+                    edge_type = edge_type.astype(np.int32)
+        else:
+            #* design choice, only stores the original edges not the inverse relations on disc
+            if ("tkgl" in self.name):
+                df = add_inverse_quadruples(df)
+
+            #* check the range first, then convert each column once
+            id_columns = ["u", "i", "idx"] + (["edge_type"] if ("edge_type" in df) else [])
+            assert (len(df) == 0) or (max(int(df[col].max()) for col in id_columns) < 2**31), id_range_msg
+            sources = df["u"].to_numpy(dtype=np.int32)
+            destinations = df["i"].to_numpy(dtype=np.int32)
+            timestamps = df["ts"].to_numpy(dtype=np.int64)
+            edge_idxs = df["idx"].to_numpy(dtype=np.int32)
+            weights = df["w"].to_numpy(dtype=np.float32)
+            edge_type = df["edge_type"].to_numpy(dtype=np.int32) if ("edge_type" in df) else None
+            save_cache = pyarrow is None
+
+        if save_cache:
+            full_arrays = {
+                "sources": sources,
+                "destinations": destinations,
+                "timestamps": timestamps,
+                "edge_idxs": edge_idxs,
+                "w": weights,
+            }
+            if edge_type is not None:
+                full_arrays["edge_type"] = edge_type
+            np.savez(OUT_FULL, **full_arrays)
+
+        edge_label = np.ones(len(sources), dtype=np.float32)  # should be 1 for all pos edges
         if (self.name == "tgbl-coin") or (self.name == "tgbl-review"):
             self._edge_feat = weights.reshape(-1,1)
         elif (self.name == "tgbl-comment"):
-            self._edge_feat = np.concatenate((edge_feat, weights.reshape(-1,1)), axis=1)
+            #* fill a preallocated float32 buffer, no intermediate list and no upcast of the edge features
+            self._edge_feat = np.empty((edge_feat.shape[0], edge_feat.shape[1] + 1), dtype=np.float32)
+            self._edge_feat[:, :-1] = edge_feat
+            self._edge_feat[:, -1] = weights
         else:
             self._edge_feat = edge_feat
         self._node_feat = node_feat
 
-        full_data = {
-            "sources": sources.astype(int),
-            "destinations": destinations.astype(int),
-            "timestamps": timestamps.astype(int),
+        columns = {
+            "sources": sources,
+            "destinations": destinations,
+            "timestamps": timestamps,
             "edge_idxs": edge_idxs,
-            "edge_feat": self._edge_feat,
             "w": weights,
             "edge_label": edge_label,
         }
-
         #* for tkg and thg
-        if ("edge_type" in df):
-            edge_type = np.array(df["edge_type"]).astype(int)
-            self._edge_type = edge_type
-            full_data["edge_type"] = edge_type
+        if edge_type is not None:
+            columns["edge_type"] = edge_type
+
+        #* the per edge scalars are stored row by row in one structured array so all fields of an edge share a cache line,
+        #* full_data keeps the dictionary interface with zero-copy views of the fields
+        edge_records = np.empty(
+            len(sources),
+            dtype=np.dtype([(key, value.dtype) for key, value in columns.items()], align=True),
+        )
+        for key, value in columns.items():
+            edge_records[key] = value
+        self._edge_records = edge_records
+
+        full_data = {key: edge_records[key] for key in columns}
+        full_data["edge_feat"] = self._edge_feat
+        if edge_type is not None:
+            self._edge_type = full_data["edge_type"]
 
         self._full_data = full_data
 
@@ -394,6 +504,10 @@ class LinkPropPredDataset(object):
         self._train_mask = _train_mask
         self._val_mask = _val_mask
         self._test_mask = _test_mask
+        #* edge indices of each split, gathering with them is a single contiguous pass instead of a mask scan per column
+        self._train_idx = np.flatnonzero(_train_mask)
+        self._val_idx = np.flatnonzero(_val_mask)
+        self._test_idx = np.flatnonzero(_test_mask)
 
     def generate_splits(
         self,
@@ -578,6 +692,21 @@ class LinkPropPredDataset(object):
             )
         return self._full_data
 
+    @property
+    def edge_records(self) -> np.ndarray:
+        r"""
+        the per edge fields of full_data as one structured array with dim [E], one record per edge,
+        fields: 'sources', 'destinations', 'timestamps', 'edge_idxs', 'w', 'edge_label' and 'edge_type' for tkg and thg
+
+        Returns:
+            edge_records: np.ndarray
+        """
+        if self._edge_records is None:
+            raise ValueError(
+                "dataset has not been processed yet, please call pre_process() first"
+            )
+        return self._edge_records
+
     @property
     def train_mask(self) -> np.ndarray:
         r"""
@@ -611,6 +740,67 @@ class LinkPropPredDataset(object):
             raise ValueError("test split hasn't been loaded")
         return self._test_mask
 
+    def _split_data(self, idx: np.ndarray) -> Dict[str, Any]:
+        r"""
+        gather the edges at `idx` into a dictionary with the same keys as full_data,
+        all per edge fields are gathered in one pass over the edge records
+        Args:
+            idx: sorted indices of the edges in the split
+        Returns:
+            split_data: Dict[str, Any]
+        """
+        split_records = self._edge_records.take(idx)
+        split_data = {key: split_records[key] for key in split_records.dtype.names}
+        edge_feat = self._edge_feat
+        if edge_feat.shape[0] != len(self._edge_records):
+            #* tkgl edge features only cover the original edges, not the inverse ones, passed through as in full_data
+            split_data["edge_feat"] = edge_feat
+        elif (len(idx) > 0) and (idx[-1] - idx[0] + 1 == len(idx)):
+            #* the splits are chronological so idx is a contiguous range, slicing avoids copying the features
+            split_data["edge_feat"] = edge_feat[idx[0] : idx[-1] + 1]
+        else:
+            split_data["edge_feat"] = edge_feat.take(idx, axis=0)
+        return split_data
+
+    @property
+    def train_data(self) -> Dict[str, Any]:
+        r"""
+        Returns the training split as a dictionary with the same keys as full_data
+        Returns:
+            train_data: Dict[str, Any]
+        """
+        if self._train_mask is None:
+            raise ValueError("training split hasn't been loaded")
+        if self._train_data is None:
+            self._train_data = self._split_data(self._train_idx)
+        return self._train_data
+
+    @property
+    def val_data(self) -> Dict[str, Any]:
+        r"""
+        Returns the validation split as a dictionary with the same keys as full_data
+        Returns:
+            val_data: Dict[str, Any]
+        """
+        if self._val_mask is None:
+            raise ValueError("validation split hasn't been loaded")
+        if self._val_data is None:
+            self._val_data = self._split_data(self._val_idx)
+        return self._val_data
+
+    @property
+    def test_data(self) -> Dict[str, Any]:
+        r"""
+        Returns the test split as a dictionary with the same keys as full_data
+        Returns:
+            test_data: Dict[str, Any]
+        """
+        if self._test_mask is None:
+            raise ValueError("test split hasn't been loaded")
+        if self._test_data is None:
+            self._test_data = self._split_data(self._test_idx)
+        return self._test_data
+
 
 def main():
 
@@ -13,6 +13,7 @@ class PyGLinkPropPredDataset(Dataset):
         root: str,
         transform: Optional[Callable] = None,
         pre_transform: Optional[Callable] = None,
+        mmap: Optional[bool] = True,
     ):
         r"""
         PyG wrapper for the LinkPropPredDataset
@@ -23,10 +24,11 @@ class PyGLinkPropPredDataset(Dataset):
             root (string): Root directory where the dataset should be saved, passed to `LinkPropPredDataset`
             transform (callable, optional): A function/transform that takes in an, not used in this case
             pre_transform (callable, optional): A function/transform that takes in, not used in this case
+            mmap: whether to memory-map the processed feature files, passed to `LinkPropPredDataset`
         """
         self.name = name
         self.root = root
-        self.dataset = LinkPropPredDataset(name=name, root=root)
+        self.dataset = LinkPropPredDataset(name=name, root=root, mmap=mmap)
         self._train_mask = torch.from_numpy(self.dataset.train_mask)
         self._val_mask = torch.from_numpy(self.dataset.val_mask)
         self._test_mask = torch.from_numpy(self.dataset.test_mask)
@@ -272,14 +274,16 @@ class PyGLinkPropPredDataset(Dataset):
             edge_type = torch.from_numpy(self.dataset.full_data["edge_type"])
             if edge_type.dtype != torch.int64:
                 edge_type = edge_type.long()
-            self._edge_type = edge_type
+            self._edge_type = edge_type.contiguous()
 
-        self._src = src
-        self._dst = dst
-        self._ts = ts
-        self._edge_label = edge_label
+        #* the per edge fields of full_data are strided views into the edge records,
+        #* fields that needed no dtype conversion are copied once so the tensors are dense and do not keep the records alive
+        self._src = src.contiguous()
+        self._dst = dst.contiguous()
+        self._ts = ts.contiguous()
+        self._edge_label = edge_label.contiguous()
         self._edge_feat = msg
-        self._w = w
+        self._w = w.contiguous()
 
     def get_TemporalData(self) -> TemporalData:
         """
@@ -40,6 +40,7 @@ class THGNegativeEdgeSampler(object):
         """
         self.dataset_name = dataset_name
         self.eval_set = {}
+        self.eval_tensors = {}
         self.first_node_id = first_node_id
         self.last_node_id = last_node_id
         self.node_type = node_type
@@ -66,6 +67,7 @@ class THGNegativeEdgeSampler(object):
         if not os.path.exists(fname):
             raise FileNotFoundError(f"File not found at {fname}")
         self.eval_set[split_mode] = load_pkl(fname)
+        self.eval_tensors.pop(split_mode, None)
 
     def query_batch(self, 
                     pos_src: Union[Tensor, np.ndarray], 
@@ -127,3 +129,104 @@ class THGNegativeEdgeSampler(object):
         
         #? can't convert to numpy array due to different lengths of negative samples
         return neg_samples
+
+    def _build_eval_tensors(
+        self,
+        split_mode: str,
+        device: torch.device,
+    ) -> dict:
+        r"""
+        convert the evaluation set of `split_mode` into sorted lookup tensors on `device`
+        each (timestamp, source, edge type) key is encoded into one int64 so a batch is resolved with a single searchsorted,
+        the negatives are padded with -1 to the longest list
+
+        Parameters:
+            split_mode: the split mode of the evaluation set, can be either `val` or `test`
+            device: the device to store the lookup tensors on
+
+        Returns:
+            eval_tensors: dictionary of lookup tensors
+        """
+        eval_set = self.eval_set[split_mode]
+        keys = np.array(list(eval_set.keys()), dtype=np.int64).reshape(-1, 3)
+        neg_lists = list(eval_set.values())
+        lengths = np.array([len(neg) for neg in neg_lists], dtype=np.int64)
+        neg_table = np.full((len(neg_lists), int(lengths.max(initial=0))), -1, dtype=np.int64)
+        for row, neg in enumerate(neg_lists):
+            neg_table[row, : len(neg)] = neg
+
+        #* timestamps are replaced by their rank so the encoded key fits into int64
+        uniq_t = np.unique(keys[:, 0])
+        num_src = int(keys[:, 1].max(initial=0)) + 1
+        num_rel = int(keys[:, 2].max(initial=0)) + 1
+        if len(uniq_t) * num_src * num_rel >= 2**63:
+            raise ValueError("evaluation set is too large to be encoded into int64 keys")
+        t_rank = np.searchsorted(uniq_t, keys[:, 0])
+        codes = (t_rank * num_src + keys[:, 1]) * num_rel + keys[:, 2]
+        order = np.argsort(codes)
+
+        return {
+            "uniq_t": torch.from_numpy(uniq_t).to(device),
+            "codes": torch.from_numpy(codes[order]).to(device),
+            "neg_table": torch.from_numpy(neg_table[order]).to(device),
+            "num_src": num_src,
+            "num_rel": num_rel,
+        }
+
+    def query_batch_torch(self,
+                          pos_src: Tensor,
+                          pos_dst: Tensor,
+                          pos_timestamp: Tensor,
+                          edge_type: Tensor,
+                          split_mode: str = "test") -> Tensor:
+        r"""
+        tensor version of `query_batch`, the lookup runs on the device of `pos_src` and the negatives stay on that device
+        the evaluation set is converted into lookup tensors on the first call for each split
+
+        Parameters:
+            pos_src: positive source nodes
+            pos_dst: positive destination nodes
+            pos_timestamp: timestamps of the positive edges
+            edge_type: edge types of the positive edges
+            split_mode: specifies whether to generate negative edges for 'validation' or 'test' splits
+
+        Returns:
+            neg_samples: tensor of shape [batch_size, max_num_negatives], rows are padded with -1 after the negatives of each edge
+        """
+        assert split_mode in [
+            "val",
+            "test",
+        ], "Invalid split-mode! It should be `val`, `test`!"
+        if split_mode not in self.eval_set:
+            raise ValueError(
+                f"Evaluation set is None! You should load the {split_mode} evaluation set first!"
+            )
+        device = pos_src.device
+        if (split_mode not in self.eval_tensors) or (self.eval_tensors[split_mode]["codes"].device != device):
+            self.eval_tensors[split_mode] = self._build_eval_tensors(split_mode, device)
+        lookup = self.eval_tensors[split_mode]
+
+        pos_src = pos_src.long()
+        pos_timestamp = pos_timestamp.long()
+        edge_type = edge_type.long()
+        #* nothing to index into for an empty evaluation set, every queried edge is missing
+        if lookup["codes"].numel() == 0:
+            if pos_src.numel() == 0:
+                return lookup["neg_table"]
+            raise ValueError(
+                f"The edge ({int(pos_src[0])}, {int(pos_dst[0])}, {int(pos_timestamp[0])}, {int(edge_type[0])}) is not in the '{split_mode}' evaluation set! Please check the implementation."
+            )
+        t_rank = torch.searchsorted(lookup["uniq_t"], pos_timestamp)
+        codes = (t_rank * lookup["num_src"] + pos_src) * lookup["num_rel"] + edge_type
+        rows = torch.searchsorted(lookup["codes"], codes).clamp_(max=max(lookup["codes"].shape[0] - 1, 0))
+
+        #* both the timestamp and the encoded key must match exactly
+        t_found = lookup["uniq_t"][t_rank.clamp(max=max(lookup["uniq_t"].shape[0] - 1, 0))] == pos_timestamp
+        in_range = (pos_src >= 0) & (pos_src < lookup["num_src"]) & (edge_type >= 0) & (edge_type < lookup["num_rel"])
+        found = t_found & in_range & (lookup["codes"][rows] == codes)
+        if not bool(found.all()):
+            missing = int((~found).nonzero()[0, 0])
+            raise ValueError(
+                f"The edge ({int(pos_src[missing])}, {int(pos_dst[missing])}, {int(pos_timestamp[missing])}, {int(edge_type[missing])}) is not in the '{split_mode}' evaluation set! Please check the implementation."
+            )
+        return torch.index_select(lookup["neg_table"], 0, rows)
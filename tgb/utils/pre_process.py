@@ -8,6 +8,14 @@ import csv
 import datetime
 from datetime import date
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
+#* ids up to this multiple of the number of edge endpoints are considered dense enough for a lookup array
+DENSE_REINDEX_RATIO = 4
+
 """
 function to process node type for thg datasets
 """
@@ -42,6 +50,67 @@ def process_node_type(
                 node_feat[node_id] = node_type
     return node_feat
 
+"""
+functions for quadruple (timestamp, head, tail, relation type) edgelists
+"""
+def load_quadruple_csv(
+    fname: str,
+):
+    r"""
+    read a timestamp, head, tail, relation type .csv file in one typed pass
+    each column lands directly in an int64 numpy array, no per row python parsing
+    Args:
+        fname: the path to the raw data
+    Returns:
+        ts: np.ndarray, timestamps
+        src: np.ndarray, head node ids as in the raw file
+        dst: np.ndarray, tail node ids as in the raw file
+        relation: np.ndarray, relation types
+    """
+    df = pd.read_csv(fname, header=0, usecols=[0, 1, 2, 3], dtype=np.int64)
+    print("number of lines counted", df.shape[0])
+    ts = df.iloc[:, 0].to_numpy()
+    src = df.iloc[:, 1].to_numpy()
+    dst = df.iloc[:, 2].to_numpy()
+    relation = df.iloc[:, 3].to_numpy()
+    return ts, src, dst, relation
+
+
+def quadruple_to_pd_data(
+    ts: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    relation: np.ndarray,
+) -> pd.DataFrame:
+    r"""
+    map the raw node ids to integer ids in order of first appearance and build the edgelist dataframe
+    Args:
+        ts: timestamps
+        src: raw head node ids
+        dst: raw tail node ids
+        relation: relation types
+    """
+    num_lines = ts.shape[0]
+    feat_size = 1
+    u_list, i_list, raw_ids = reindex_np(src, dst)
+    node_ids = dict(zip(raw_ids.tolist(), range(raw_ids.shape[0])))
+    return (
+        pd.DataFrame(
+            {
+                "u": u_list,
+                "i": i_list,
+                "ts": ts,
+                "label": np.zeros(num_lines),
+                "idx": np.arange(1, num_lines + 1),
+                "w": np.ones(num_lines),
+                "edge_type": relation,
+            }
+        ),
+        np.broadcast_to(np.zeros(feat_size, dtype=np.float32), (num_lines, feat_size)),
+        node_ids,
+    )
+
+
 """
 functions for thgl-forum dataset
 """
@@ -136,63 +205,8 @@ def csv_to_thg_data(
     Args:
         fname: the path to the raw data
     """
-    feat_size = 1
-    num_lines = sum(1 for line in open(fname)) - 1
-    print("number of lines counted", num_lines)
-    u_list = np.zeros(num_lines)
-    i_list = np.zeros(num_lines)
-    ts_list = np.zeros(num_lines)
-    label_list = np.zeros(num_lines)
-    edge_type = np.zeros(num_lines)
-    feat_l = np.zeros((num_lines, feat_size))
-    idx_list = np.zeros(num_lines)
-    w_list = np.zeros(num_lines)
-    node_ids = {}
-    unique_id = 0
-
-    with open(fname, "r") as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter=",")
-        idx = 0
-        #timestamp, head, tail, relation type
-        for row in tqdm(csv_reader):
-            if idx == 0:
-                idx += 1
-                continue
-            else:
-                ts = int(row[0]) #converted to UNIX timestamp already 
-                src = int(row[1])
-                dst = int(row[2])
-                relation = int(row[3])
-                if src not in node_ids:
-                    node_ids[src] = unique_id
-                    unique_id += 1
-                if dst not in node_ids:
-                    node_ids[dst] = unique_id
-                    unique_id += 1
-                u = node_ids[src]
-                i = node_ids[dst]
-                u_list[idx - 1] = u
-                i_list[idx - 1] = i
-                ts_list[idx - 1] = ts
-                idx_list[idx - 1] = idx
-                w_list[idx - 1] = float(1)
-                edge_type[idx - 1] = relation
-                idx += 1
-    return (
-        pd.DataFrame(
-            {
-                "u": u_list,
-                "i": i_list,
-                "ts": ts_list,
-                "label": label_list,
-                "idx": idx_list,
-                "w": w_list,
-                "edge_type": edge_type,
-            }
-        ),
-        feat_l,
-        node_ids,
-    )
+    ts, src, dst, relation = load_quadruple_csv(fname)
+    return quadruple_to_pd_data(ts, src, dst, relation)
 
 """
 functions for tkgl-wikidata dataset
@@ -215,7 +229,8 @@ def csv_to_wikidata(
     ts_list = np.zeros(num_lines)
     label_list = np.zeros(num_lines)
     edge_type = np.zeros(num_lines)
-    feat_l = np.zeros((num_lines, feat_size))
+    #* there are no edge features, a read-only zero view avoids allocating [num_lines, feat_size]
+    feat_l = np.broadcast_to(np.zeros(feat_size, dtype=np.float32), (num_lines, feat_size))
     idx_list = np.zeros(num_lines)
     w_list = np.zeros(num_lines)
     node_ids = {}
@@ -339,63 +354,8 @@ def csv_to_tkg_data(
     Args:
         fname: the path to the raw data
     """
-    feat_size = 1
-    num_lines = sum(1 for line in open(fname)) - 1
-    print("number of lines counted", num_lines)
-    u_list = np.zeros(num_lines)
-    i_list = np.zeros(num_lines)
-    ts_list = np.zeros(num_lines)
-    label_list = np.zeros(num_lines)
-    edge_type = np.zeros(num_lines)
-    feat_l = np.zeros((num_lines, feat_size))
-    idx_list = np.zeros(num_lines)
-    w_list = np.zeros(num_lines)
-    node_ids = {}
-    unique_id = 0
-
-    with open(fname, "r") as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter=",")
-        idx = 0
-        #timestamp, head, tail, relation type
-        for row in tqdm(csv_reader):
-            if idx == 0:
-                idx += 1
-                continue
-            else:
-                ts = int(row[0]) #converted to UNIX timestamp already 
-                src = int(row[1])
-                dst = int(row[2])
-                relation = int(row[3])
-                if src not in node_ids:
-                    node_ids[src] = unique_id
-                    unique_id += 1
-                if dst not in node_ids:
-                    node_ids[dst] = unique_id
-                    unique_id += 1
-                u = node_ids[src]
-                i = node_ids[dst]
-                u_list[idx - 1] = u
-                i_list[idx - 1] = i
-                ts_list[idx - 1] = ts
-                idx_list[idx - 1] = idx
-                w_list[idx - 1] = float(1)
-                edge_type[idx - 1] = relation
-                idx += 1
-    return (
-        pd.DataFrame(
-            {
-                "u": u_list,
-                "i": i_list,
-                "ts": ts_list,
-                "label": label_list,
-                "idx": idx_list,
-                "w": w_list,
-                "edge_type": edge_type,
-            }
-        ),
-        feat_l,
-        node_ids,
-    )
+    ts, src, dst, relation = load_quadruple_csv(fname)
+    return quadruple_to_pd_data(ts, src, dst, relation)
 
 
 
@@ -917,7 +877,8 @@ def csv_to_pd_data_sc(
     i_list = np.zeros(num_lines)
     ts_list = np.zeros(num_lines)
     label_list = np.zeros(num_lines)
-    feat_l = np.zeros((num_lines, feat_size))
+    #* there are no edge features, a read-only zero view avoids allocating [num_lines, feat_size]
+    feat_l = np.broadcast_to(np.zeros(feat_size, dtype=np.float32), (num_lines, feat_size))
     idx_list = np.zeros(num_lines)
     w_list = np.zeros(num_lines)
     print("numpy allocated")
@@ -956,7 +917,6 @@ def csv_to_pd_data_sc(
                 ts_list[idx - 1] = ts
                 idx_list[idx - 1] = idx
                 w_list[idx - 1] = w
-                feat_l[idx - 1] = np.zeros(feat_size)
                 idx += 1
 
     #! normalize by log 2 for stablecoin
@@ -1372,4 +1332,65 @@ def reindex(
     return new_df
 
 
-    
+def reindex_np(
+    sources: np.ndarray,
+    destinations: np.ndarray,
+):
+    r"""
+    vectorized reindexing of the node ids with np.unique, no per row python dispatch
+    nodes are numbered from 0 in order of first appearance (row by row, source before destination),
+    the same ids as assigning them one by one while scanning the edgelist
+    Args:
+        sources: raw source node ids
+        destinations: raw destination node ids
+    Returns:
+        new_sources: np.ndarray, reindexed source node ids
+        new_destinations: np.ndarray, reindexed destination node ids
+        raw_ids: np.ndarray, raw node id of each new node id
+    """
+    all_ids = np.stack([sources, destinations], axis=1).ravel()
+    #* dense non-negative integer ids can be mapped with a lookup array in one compiled pass, without sorting
+    if (
+        (numba is not None)
+        and (all_ids.shape[0] > 0)
+        and np.issubdtype(all_ids.dtype, np.integer)
+        and (all_ids.min() >= 0)
+        and (all_ids.max() < DENSE_REINDEX_RATIO * all_ids.shape[0])
+    ):
+        id_to_new = np.full(int(all_ids.max()) + 1, -1, dtype=np.int64)
+        new_ids, num_nodes = _first_appearance_ids(all_ids.astype(np.int64, copy=False), id_to_new)
+        raw_ids = np.empty(num_nodes, dtype=all_ids.dtype)
+        seen = np.flatnonzero(id_to_new >= 0)
+        raw_ids[id_to_new[seen]] = seen
+        new_ids = new_ids.reshape(-1, 2)
+        return new_ids[:, 0], new_ids[:, 1], raw_ids
+
+    uniq_ids, first_idx, inverse = np.unique(all_ids, return_index=True, return_inverse=True)
+    order = np.argsort(first_idx)
+    rank = np.empty(order.shape[0], dtype=np.int64)
+    rank[order] = np.arange(order.shape[0])
+    new_ids = rank[inverse.reshape(-1)].reshape(-1, 2)
+    return new_ids[:, 0], new_ids[:, 1], uniq_ids[order]
+
+
+def _first_appearance_ids(
+    all_ids: np.ndarray,
+    id_to_new: np.ndarray,
+):
+    r"""
+    assign new ids in order of first appearance using the dense lookup array `id_to_new` (-1 for unseen ids),
+    compiled with numba when it is installed; the scan is sequential since each id depends on the ids seen before it
+    """
+    new_ids = np.empty_like(all_ids)
+    num_nodes = 0
+    for k in range(all_ids.shape[0]):
+        raw = all_ids[k]
+        if id_to_new[raw] < 0:
+            id_to_new[raw] = num_nodes
+            num_nodes += 1
+        new_ids[k] = id_to_new[raw]
+    return new_ids, num_nodes
+
+
+if numba is not None:
+    _first_appearance_ids = numba.njit(cache=True)(_first_appearance_ids)
@@ -4,8 +4,10 @@ import pickle
 import sys
 import argparse
 import json
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import torch
-from typing import Any
+from typing import Any, Iterator
 import numpy as np
 from torch_geometric.data import TemporalData
 import pandas as pd
@@ -196,3 +198,113 @@ def split_by_time(data):
 
     return snapshot_list
 
+
+
+_worker_ns_sampler = None
+
+
+def _init_ns_worker(neg_sampler: Any) -> None:
+    global _worker_ns_sampler
+    _worker_ns_sampler = neg_sampler
+
+
+def _query_ns(neg_sampler: Any, args: tuple) -> list:
+    pos_src, pos_dst, pos_timestamp, edge_type, split_mode = args
+    if edge_type is None:
+        return neg_sampler.query_batch(pos_src, pos_dst, pos_timestamp, split_mode=split_mode)
+    return neg_sampler.query_batch(pos_src, pos_dst, pos_timestamp, edge_type, split_mode=split_mode)
+
+
+def _query_ns_worker(args: tuple) -> list:
+    return _query_ns(_worker_ns_sampler, args)
+
+
+def parallel_query_batch(
+    neg_sampler: Any,
+    pos_src: np.ndarray,
+    pos_dst: np.ndarray,
+    pos_timestamp: np.ndarray,
+    edge_type: np.ndarray = None,
+    split_mode: str = "test",
+    batch_size: int = 200,
+    num_workers: int = None,
+) -> list:
+    r"""
+    run `neg_sampler.query_batch` for all batches of a split on a pool of worker processes
+    the sampler (with its loaded evaluation set) is sent to each worker once, only the batch slices are sent per task
+    memory: every worker holds its own copy of the evaluation set (pickled under spawn, copied page by page under fork
+    as reference counts are updated), and the negatives of every edge are pickled back to the caller,
+    which can cost more than the dict lookups themselves; with a single worker the batches are queried in process
+    Args:
+        neg_sampler: negative edge sampler with the evaluation set of `split_mode` already loaded
+        pos_src: source nodes of the whole split
+        pos_dst: destination nodes of the whole split
+        pos_timestamp: timestamps of the whole split
+        edge_type: edge types of the whole split, None for samplers without edge types
+        split_mode: `val` or `test`
+        batch_size: number of positive edges per query_batch call
+        num_workers: number of worker processes, defaults to the number of cpus capped at 8
+    Returns:
+        neg_batch_lists: list with the output of query_batch for each batch, in order
+    """
+    if num_workers is None:
+        num_workers = min(8, os.cpu_count() or 1)
+    tasks = []
+    for start in range(0, len(pos_src), batch_size):
+        end = start + batch_size
+        tasks.append((
+            pos_src[start:end],
+            pos_dst[start:end],
+            pos_timestamp[start:end],
+            None if edge_type is None else edge_type[start:end],
+            split_mode,
+        ))
+    if num_workers <= 1:
+        return [_query_ns(neg_sampler, task) for task in tasks]
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        initializer=_init_ns_worker,
+        initargs=(neg_sampler,),
+    ) as executor:
+        #* a few chunks per worker keeps the per task overhead low while balancing the load
+        chunksize = max(1, len(tasks) // (4 * num_workers))
+        return list(executor.map(_query_ns_worker, tasks, chunksize=chunksize))
+
+
+def seq_batches(
+    data: TemporalData,
+    batch_size: int,
+) -> Iterator[TemporalData]:
+    r"""
+    yield successive slices of `data` with `batch_size` events each
+    same batches as an unshuffled `TemporalDataLoader` without the DataLoader sampling and collation,
+    the slices are views of the tensors in `data`
+    Args:
+        data: the temporal data to iterate over
+        batch_size: number of events per batch
+    Yields:
+        batch: TemporalData with the events of the current batch
+    """
+    for start in range(0, data.num_events, batch_size):
+        yield data[start:start + batch_size]
+
+
+#* struct of arrays view of an evaluation split, sliced per batch instead of converting each batch tensor
+BatchNP = namedtuple("BatchNP", ["src", "dst", "t", "rel"])
+
+
+def temporal_data_to_np(data: TemporalData) -> BatchNP:
+    r"""
+    convert the src, dst, t and edge_type tensors of a split to numpy once,
+    cpu tensors share their memory with the returned arrays
+    Args:
+        data: the temporal data of the split, must have `edge_type`
+    Returns:
+        batch_np: BatchNP with the numpy arrays of the split
+    """
+    return BatchNP(
+        data.src.detach().cpu().numpy(),
+        data.dst.detach().cpu().numpy(),
+        data.t.detach().cpu().numpy(),
+        data.edge_type.detach().cpu().numpy(),
+    )